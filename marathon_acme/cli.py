@@ -7,10 +7,11 @@ from twisted.internet.endpoints import quoteStringArgument
 from twisted.internet.task import react
 from twisted.logger import (
     FilteringLogObserver, LogLevel, LogLevelFilterPredicate, Logger,
-    globalLogPublisher, textFileLogObserver)
+    globalLogBeginner, globalLogPublisher, textFileLogObserver)
 from twisted.python.compat import unicode
 from twisted.python.filepath import FilePath
 from twisted.python.url import URL
+from twisted.web.client import HTTPConnectionPool
 
 from txacme.store import DirectoryStore
 from txacme.urls import LETSENCRYPT_DIRECTORY
@@ -19,13 +20,20 @@ from marathon_acme import __version__
 from marathon_acme.acme_util import (
     create_txacme_client_creator, generate_wildcard_pem_bytes, maybe_key,
     maybe_key_vault)
-from marathon_acme.clients import MarathonClient, MarathonLbClient, VaultClient
+from marathon_acme.clients import (
+    MarathonClient, MarathonLbClient, VaultClient, default_client)
 from marathon_acme.service import MarathonAcme
 from marathon_acme.vault_store import VaultKvCertificateStore
 
 
 log = Logger()
 
+_LOG_LEVEL_NAMES = ('debug', 'info', 'warn', 'error', 'critical')
+_LOG_LEVELS = {name: LogLevel.levelWithName(name) for name in _LOG_LEVEL_NAMES}
+
+# The observer added by init_logging(), if any
+_log_observer = None
+
 
 def main(reactor, argv=sys.argv[1:], env=os.environ,
          acme_url=LETSENCRYPT_DIRECTORY.asText()):
@@ -79,7 +87,7 @@ def main(reactor, argv=sys.argv[1:], env=os.environ,
     parser.add_argument('--log-level',
                         help='The minimum severity level to log messages at '
                              '(default: %(default)s)',
-                        choices=['debug', 'info', 'warn', 'error', 'critical'],
+                        choices=_LOG_LEVEL_NAMES,
                         default='info'),
     parser.add_argument('--vault',
                         help=('Enable storage of certificates in Vault. This '
@@ -121,8 +129,8 @@ def main(reactor, argv=sys.argv[1:], env=os.environ,
         ('endpoint-description', endpoint_description),
     ]
     log_args = ['{}={!r}'.format(k, v) for k, v in log_args]
-    log.info('Starting marathon-acme {} with: {}'.format(
-        __version__, ', '.join(log_args)))
+    log.info('Starting marathon-acme {version} with: {args}',
+             version=__version__, args=', '.join(log_args))
 
     if args.vault:
         key_d, cert_store = init_vault_storage(
@@ -221,10 +229,20 @@ def create_marathon_acme(
         app domains.
     :param reactor: The reactor to use.
     """
+    # Share a connection pool between the Marathon and marathon-lb clients so
+    # that connections are reused across requests. The pool lives as long as
+    # the service does, so close its idle connections when the reactor stops.
+    pool = HTTPConnectionPool(reactor, persistent=True)
+    pool.maxPersistentPerHost = 4
+    reactor.addSystemEventTrigger(
+        'before', 'shutdown', pool.closeCachedConnections)
+    client, _ = default_client(reactor, pool=pool)
+
     marathon_client = MarathonClient(marathon_addrs, timeout=marathon_timeout,
                                      sse_kwargs={'timeout': sse_timeout},
-                                     reactor=reactor)
-    marathon_lb_client = MarathonLbClient(mlb_addrs, reactor=reactor)
+                                     client=client, reactor=reactor)
+    marathon_lb_client = MarathonLbClient(
+        mlb_addrs, client=client, reactor=reactor)
 
     return MarathonAcme(
         marathon_client,
@@ -271,16 +289,30 @@ def init_storage_dir(storage_dir):
 def init_logging(log_level):
     """
     Initialise the logging by adding an observer to the global log publisher.
+    If logging has already been initialised, the previous observer is replaced.
+
+    The first time this is called, the global log beginner is told to start
+    logging to the observer. This discards the events that the log publisher
+    buffers until logging begins (up to 64K of them by default), rather than
+    keeping them in memory for the lifetime of the process.
 
     :param str log_level: The minimum log level to log messages for.
     """
-    log_level_filter = LogLevelFilterPredicate(
-        LogLevel.levelWithName(log_level))
+    global _log_observer
+
+    log_level_filter = LogLevelFilterPredicate(_LOG_LEVELS[log_level])
     log_level_filter.setLogLevelForNamespace(
         'twisted.web.client._HTTP11ClientFactory', LogLevel.warn)
     log_observer = FilteringLogObserver(
         textFileLogObserver(sys.stdout), [log_level_filter])
-    globalLogPublisher.addObserver(log_observer)
+
+    if _log_observer is None:
+        globalLogBeginner.beginLoggingTo(
+            [log_observer], discardBuffer=True, redirectStandardIO=False)
+    else:
+        globalLogPublisher.removeObserver(_log_observer)
+        globalLogPublisher.addObserver(log_observer)
+    _log_observer = log_observer
 
 
 def init_vault_storage(reactor, env, mount_path):
@@ -1,7 +1,8 @@
 from marathon_acme.clients._base import HTTPError, get_single_header
+from marathon_acme.clients._tx_util import default_client
 from marathon_acme.clients.marathon import MarathonClient
 from marathon_acme.clients.marathon_lb import MarathonLbClient
 from marathon_acme.clients.vault import VaultClient
 
 __all__ = ['HTTPError', 'MarathonClient', 'MarathonLbClient', 'VaultClient',
-           'get_single_header']
+           'default_client', 'get_single_header']
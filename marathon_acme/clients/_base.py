@@ -1,13 +1,47 @@
-import cgi
-
-from requests.exceptions import HTTPError
+import json
+from functools import partial
 
 from twisted.logger import LogLevel, Logger
+from twisted.python.compat import unicode, urllib_parse
 
-from uritools import uricompose, uridecode, urisplit
+from uritools import uridecode, urisplit
 
 from marathon_acme.clients._tx_util import default_client
 
+# The request kwargs that override parts of the URL
+_URL_KWARGS = ('scheme', 'host', 'port', 'path', 'fragment', 'params')
+
+# Characters that don't need to be percent-encoded in each part of a URL, as
+# per RFC 3986. Unreserved characters are never encoded by quote().
+_PATH_SAFE = "/!$&'()*+,;=:@"
+_QUERY_SAFE = _PATH_SAFE + '?'
+_QUERY_PARAM_SAFE = "/!$'()*,;:@?"
+_FRAGMENT_SAFE = _QUERY_SAFE
+
+# Composed URLs, keyed by the base URL and the URL parts that were overridden.
+# Clients tend to make requests to the same few URLs over and over, so this
+# should stay small, but it is cleared if it ever grows too big.
+_composed_urls = {}
+_COMPOSED_URLS_MAX_SIZE = 256
+
+# Each client only makes requests to its own base URL or the odd override, so
+# its cache of credentials from those URLs only needs to be very small.
+_URL_AUTHS_MAX_SIZE = 16
+
+
+class RequestException(IOError):
+    """
+    There was an error making a request. Mirrors the exception of the same
+    name from the Requests library so that we don't have to depend on it.
+    """
+    def __init__(self, *args, **kwargs):
+        self.response = kwargs.pop('response', None)
+        super(RequestException, self).__init__(*args, **kwargs)
+
+
+class HTTPError(RequestException):
+    """An HTTP error occurred."""
+
 
 def get_single_header(headers, key):
     """
@@ -22,44 +56,157 @@ def get_single_header(headers, key):
     if raw_headers is None:
         return None
 
-    # Take the final header as the authorative
-    header, _ = cgi.parse_header(raw_headers[-1])
-    return header
+    # Take the final header as the authorative and strip off any parameters.
+    # This is all we used cgi.parse_header() for.
+    return raw_headers[-1].split(';', 1)[0].strip()
+
+
+# Error message formats for failed responses, keyed by status code class
+_STATUS_ERR = {
+    4: '%s Client Error for url: %s',
+    5: '%s Server Error for url: %s',
+}
 
 
 def raise_for_status(response):
     """
-    Raises a `requests.exceptions.HTTPError` if the response did not succeed.
+    Raises an `HTTPError` if the response did not succeed.
     Adapted from the Requests library:
     https://github.com/kennethreitz/requests/blob/v2.8.1/requests/models.py#L825-L837
     """
-    http_error_msg = ''
-
-    if 400 <= response.code < 500:
-        http_error_msg = '%s Client Error for url: %s' % (
-            response.code, uridecode(response.request.absoluteURI))
+    http_error_fmt = _STATUS_ERR.get(response.code // 100)
+    if http_error_fmt is None:
+        return response
 
-    elif 500 <= response.code < 600:
-        http_error_msg = '%s Server Error for url: %s' % (
-            response.code, uridecode(response.request.absoluteURI))
+    raise HTTPError(http_error_fmt % (
+        response.code, uridecode(response.request.absoluteURI)),
+        response=response)
 
-    if http_error_msg:
-        raise HTTPError(http_error_msg, response=response)
 
-    return response
+_MISSING_HEADER_ERR = (
+    'Expected header "%s" to be "%s" but header not found in response')
+_WRONG_HEADER_ERR = 'Expected header "%s" to be "%s" but found "%s" instead'
 
 
 def raise_for_header(response, key, expected):
     header = get_single_header(response.headers, key)
+    if header == expected:
+        return response
+
     if header is None:
-        raise HTTPError('Expected header "%s" to be "%s" but header not found '
-                        'in response' % (key, expected,))
+        raise HTTPError(_MISSING_HEADER_ERR % (key, expected,))
+
+    raise HTTPError(_WRONG_HEADER_ERR % (key, expected, header,))
+
+
+def json_content(response):
+    """
+    Read the contents of a response and decode it as JSON. Unlike
+    ``treq.json_content()``, the Content-Type header is not parsed for a
+    charset: JSON is always UTF-8 (RFC 7159).
+    """
+    d = response.content()
+    return d.addCallback(lambda body: json.loads(body.decode('utf-8')))
 
-    if header != expected:
-        raise HTTPError('Expected header "%s" to be "%s" but found "%s" '
-                        'instead' % (key, expected, header,))
 
-    return response
+def _freeze(value):
+    """
+    Convert dicts and lists (e.g. query parameters) into tuples so that they
+    can be used in a cache key. Each value is paired with its type, as values
+    that compare equal can be encoded differently in a URL (e.g. ``True``,
+    ``1`` and ``1.0``). Dict items keep their order, which is the order they
+    are encoded in.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(
+            (_freeze(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(v) for v in value))
+    return (type(value), value)
+
+
+def _strip_userinfo(url):
+    """
+    Remove any userinfo (credentials) from the given URL.
+    """
+    scheme, netloc, path, query, fragment = urllib_parse.urlsplit(url)
+    return urllib_parse.urlunsplit(
+        (scheme, netloc.rpartition('@')[2], path, query, fragment))
+
+
+def _quote(value, safe):
+    """
+    UTF-8 encode the given value, if it isn't bytes, and percent-encode it.
+    """
+    if not isinstance(value, (bytes, unicode)):
+        value = unicode(value)
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return urllib_parse.quote(value, safe=safe)
+
+
+def _encode_query(params):
+    """
+    Percent-encode query parameters given as a string, a dict, or a list of
+    (name, value) pairs. Values may be lists to repeat a parameter and a value
+    of None gives a parameter with no value.
+    """
+    if isinstance(params, (bytes, unicode)):
+        return _quote(params, _QUERY_SAFE)
+
+    if isinstance(params, dict):
+        params = params.items()
+
+    parts = []
+    for name, values in params:
+        name = _quote(name, _QUERY_PARAM_SAFE)
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        for value in values:
+            if value is None:
+                parts.append(name)
+            else:
+                parts.append(
+                    '='.join((name, _quote(value, _QUERY_PARAM_SAFE))))
+    return '&'.join(parts)
+
+
+def _compose(url, overrides):
+    """
+    Compose a URL from the given URL, with the given list of (key, value)
+    pairs overriding parts of it. Any userinfo in the URL is dropped.
+
+    All the URLs we deal with have the form scheme://host:port/path?query, so
+    this uses the standard library's URL splitting rather than a full RFC 3986
+    implementation like uritools.
+    """
+    scheme, netloc, path, query, fragment = urllib_parse.urlsplit(url)
+    overrides = dict(overrides)
+
+    netloc = netloc.rpartition('@')[2]
+    if 'host' in overrides or 'port' in overrides:
+        if netloc.endswith(']') or ':' not in netloc:
+            host, port = netloc, None
+        else:
+            host, _, port = netloc.rpartition(':')
+        host = overrides.get('host', host)
+        port = overrides.get('port', port)
+
+        if ':' in host and not host.startswith('['):
+            host = '[%s]' % (host,)  # IPv6 address
+        netloc = host if port in [None, ''] else '%s:%s' % (host, port)
+
+    scheme = overrides.get('scheme', scheme)
+    if 'path' in overrides:
+        path = _quote(overrides['path'], _PATH_SAFE)
+        if netloc and path and not path.startswith('/'):
+            raise ValueError('Invalid path with authority component')
+    if 'params' in overrides:
+        query = _encode_query(overrides['params'])
+    if 'fragment' in overrides:
+        fragment = _quote(overrides['fragment'], _FRAGMENT_SAFE)
+
+    return urllib_parse.urlunsplit((scheme, netloc, path, query, fragment))
 
 
 class HTTPClient(object):
@@ -72,10 +219,15 @@ class HTTPClient(object):
         Create a client with the specified default URL.
         """
         self.url = url
-        self._timeout = timeout
         # Keep track of the reactor because treq uses it for timeouts in a
         # clumsy way
         self._client, self._reactor = default_client(reactor, client)
+        # The reactor and default timeout are the same for every request
+        self._treq_request = partial(
+            self._client.request, reactor=self._reactor, timeout=timeout)
+
+        # The basic auth credentials in each URL requested, if any
+        self._url_auths = {}
 
     def _log_request_response(self, response, method, path, kwargs):
         self.log.debug(
@@ -88,6 +240,25 @@ class HTTPClient(object):
                          LogLevel.error, url=url)
         return failure
 
+    def _url_auth(self, url):
+        """
+        Get the (username, password) tuple from the userinfo in the given URL,
+        or None if the URL has no userinfo. The result is cached for each URL
+        this client makes requests to.
+        """
+        try:
+            return self._url_auths[url]
+        except KeyError:
+            pass
+
+        userinfo = urisplit(url).userinfo
+        # treq expects a 2-tuple (username, password)
+        auth = tuple(userinfo.split(':', 2)) if userinfo is not None else None
+        if len(self._url_auths) >= _URL_AUTHS_MAX_SIZE:
+            self._url_auths.clear()
+        self._url_auths[url] = auth
+        return auth
+
     def _compose_url(self, url, kwargs):
         """
         Compose a URL starting with the given URL (or self.url if that URL is
@@ -106,29 +277,38 @@ class HTTPClient(object):
             raise ValueError(
                 'url not provided and this client has no url attribute')
 
-        split_result = urisplit(url)
-        userinfo = split_result.userinfo
-
-        # Build up the kwargs to pass to uricompose
-        compose_kwargs = {}
-        for key in ['scheme', 'host', 'port', 'path', 'fragment']:
-            if key in kwargs:
-                compose_kwargs[key] = kwargs.pop(key)
-            else:
-                compose_kwargs[key] = getattr(split_result, key)
-
-        if 'params' in kwargs:
-            compose_kwargs['query'] = kwargs.pop('params')
-        else:
-            compose_kwargs['query'] = split_result.query
+        # Like treq, treat a value of None the same as no value at all
+        overrides = []
+        for key in _URL_KWARGS:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                overrides.append((key, value))
 
         # Take the userinfo out of the URL and pass as 'auth' to treq so it can
-        # be used for HTTP basic auth headers
-        if 'auth' not in kwargs and userinfo is not None:
-            # treq expects a 2-tuple (username, password)
-            kwargs['auth'] = tuple(userinfo.split(':', 2))
-
-        return uricompose(**compose_kwargs)
+        # be used for HTTP basic auth headers. The composed URL never has
+        # userinfo, so strip it before using the URL in the shared cache so
+        # that we don't hang on to credentials there.
+        if '@' in url:
+            if 'auth' not in kwargs:
+                auth = self._url_auth(url)
+                if auth is not None:
+                    kwargs['auth'] = auth
+            url = _strip_userinfo(url)
+
+        try:
+            cache_key = (url, _freeze(overrides))
+            composed_url = _composed_urls.get(cache_key)
+        except TypeError:
+            # Something unhashable in the overrides, don't cache
+            return _compose(url, overrides)
+
+        if composed_url is None:
+            composed_url = _compose(url, overrides)
+            if len(_composed_urls) >= _COMPOSED_URLS_MAX_SIZE:
+                _composed_urls.clear()
+            _composed_urls[cache_key] = composed_url
+
+        return composed_url
 
     def request(self, method, url=None, **kwargs):
         """
@@ -146,11 +326,10 @@ class HTTPClient(object):
         """
         url = self._compose_url(url, kwargs)
 
-        kwargs.setdefault('timeout', self._timeout)
-
-        d = self._client.request(method, url, reactor=self._reactor, **kwargs)
+        d = self._treq_request(method, url, **kwargs)
 
-        d.addCallback(self._log_request_response, method, url, kwargs)
-        d.addErrback(self._log_request_error, url)
+        d.addCallbacks(
+            self._log_request_response, self._log_request_error,
+            callbackArgs=(method, url, kwargs), errbackArgs=(url,))
 
         return d
@@ -1,3 +1,5 @@
+import pem
+
 from treq.client import HTTPClient
 
 from twisted.internet import ssl
@@ -9,16 +11,21 @@ from twisted.web.iweb import IPolicyForHTTPS
 
 from zope.interface import implementer
 
+# The maximum number of connection creators a ClientPolicyForHTTPS will hold
+# on to
+_CREATORS_MAX_SIZE = 128
+
 
 def default_client(reactor, client=None, agent=None, contextFactory=None,
-                   pool=None, persistent=False):
+                   pool=None, persistent=True, maxPersistentPerHost=None):
     reactor = _default_reactor(reactor)
 
     if client is not None:
         return client, reactor
 
     if agent is None:
-        pool = HTTPConnectionPool(reactor, persistent=persistent)
+        if pool is None:
+            pool = _default_pool(reactor, persistent, maxPersistentPerHost)
         contextFactory = _default_contextFactory(contextFactory)
         agent = Agent(reactor, contextFactory=contextFactory, pool=pool)
 
@@ -31,6 +38,30 @@ def _default_reactor(reactor=None):
     return reactor
 
 
+def _default_pool(reactor, persistent, maxPersistentPerHost=None):
+    pool = HTTPConnectionPool(reactor, persistent=persistent)
+    if maxPersistentPerHost is not None:
+        pool.maxPersistentPerHost = maxPersistentPerHost
+    return pool
+
+
+def _load_trust_root(path):
+    """
+    Load a trust root from a PEM file containing one or more CA certificates.
+    The file is parsed in a single pass.
+    """
+    certs = [ssl.Certificate.loadPEM(pem_object.as_bytes())
+             for pem_object in pem.parse_file(path)
+             if isinstance(pem_object, pem.Certificate)]
+    if not certs:
+        raise ValueError('No certificates found in CA file: %s' % (path,))
+
+    if len(certs) == 1:
+        return certs[0]
+
+    return ssl.trustRootFromCertificates(certs)
+
+
 def _default_contextFactory(contextFactory=None, **kwargs):
     if contextFactory is not None:
         return contextFactory
@@ -59,6 +90,9 @@ class ClientPolicyForHTTPS(object):
             tls_server_name = tls_server_name.decode('utf-8')
         self._tls_server_name = tls_server_name
 
+        # Connection creators, keyed by the hostname used for verification
+        self._creators = {}
+
     @classmethod
     def from_pem_files(cls, caKey=None, privateKey=None, certKey=None,
                        tls_server_name=None):
@@ -67,8 +101,8 @@ class ClientPolicyForHTTPS(object):
         instance.
 
         :param caKey:
-            Path to the CA certificate file. If not provided, the system trust
-            chain will be used.
+            Path to the CA certificate file. This may be a bundle of several
+            certificates. If not provided, the system trust chain will be used.
         :param privateKey:
             Path to the client private key file. If either this or certKey are
             not provided, a client-side certificate will not be used.
@@ -78,7 +112,7 @@ class ClientPolicyForHTTPS(object):
         """
         trust_root, client_certificate = None, None
         if caKey:
-            trust_root = ssl.Certificate.loadPEM(FilePath(caKey).getContent())
+            trust_root = _load_trust_root(caKey)
 
         if privateKey and certKey:
             # This is similar to this code:
@@ -97,6 +131,16 @@ class ClientPolicyForHTTPS(object):
         else:
             ssl_hostname = hostname.decode("ascii")
 
-        return ssl.optionsForClientTLS(
-            ssl_hostname, trustRoot=self._trustRoot,
-            clientCertificate=self._clientCertificate)
+        # Building the options sets up a whole new OpenSSL context, but the
+        # result can be used for any number of connections, so build it once
+        # per hostname.
+        creator = self._creators.get(ssl_hostname)
+        if creator is None:
+            creator = ssl.optionsForClientTLS(
+                ssl_hostname, trustRoot=self._trustRoot,
+                clientCertificate=self._clientCertificate)
+            if len(self._creators) >= _CREATORS_MAX_SIZE:
+                self._creators.clear()
+            self._creators[ssl_hostname] = creator
+
+        return creator
@@ -1,22 +1,30 @@
 import json
 
-from requests.exceptions import HTTPError
-
-from treq.content import json_content
-
+from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.web.http import OK
 
 from uritools import uridecode
 
 from marathon_acme.clients._base import (
-    HTTPClient, raise_for_header, raise_for_status)
+    HTTPClient, HTTPError, json_content, raise_for_header, raise_for_status)
 from marathon_acme.sse_protocol import SseProtocol
 
+_APPLICATION_JSON = 'application/json'
+
+# Sentinel for missing JSON fields, since null is a valid JSON value
+_MISSING = object()
+
+# Request headers are the same for every request of a kind, so build them once
+_JSON_HEADERS = {'Accept': _APPLICATION_JSON}
+_EVENT_STREAM_HEADERS = {
+    'Accept': 'text/event-stream',
+    'Cache-Control': 'no-store'
+}
+
 
 def raise_for_not_ok_status(response):
     """
-    Raises a `requests.exceptions.HTTPError` if the response has a non-200
-    status code.
+    Raises an `HTTPError` if the response has a non-200 status code.
     """
     if response.code != OK:
         raise HTTPError('Non-200 response code (%s) for url: %s' % (
@@ -68,32 +76,64 @@ class MarathonClient(HTTPClient):
         self.endpoints = endpoints
         self._sse_kwargs = {} if sse_kwargs is None else sse_kwargs
 
+        # The endpoint that the last request succeeded with. This is tried
+        # first so that we don't fail over on every request when an endpoint
+        # is down.
+        self._preferred_endpoint = None
+
+        # Lists of Deferreds waiting on the follow-up to calls in progress,
+        # keyed by call
+        self._pending_calls = {}
+
     def request(self, *args, **kwargs):
-        d = self._request(None, list(self.endpoints), *args, **kwargs)
+        d = self._request(
+            None, self._ordered_endpoints(), 0, *args, **kwargs)
         d.addErrback(self._log_all_endpoints_failed)
         return d
 
-    def _request(self, failure, endpoints, *args, **kwargs):
+    def _ordered_endpoints(self):
         """
-        Recursively make requests to each endpoint in ``endpoints``.
+        Get the sequence of endpoints in the order they should be tried: the
+        preferred endpoint (if any) first, and then the rest in priority order.
         """
-        # We've run out of endpoints, fail
-        if not endpoints:
-            return failure
+        preferred = self._preferred_endpoint
+        if preferred is None or preferred == self.endpoints[0]:
+            return self.endpoints
 
-        endpoint = endpoints.pop(0)
+        return [preferred] + [e for e in self.endpoints if e != preferred]
+
+    def _request(self, failure, endpoints, index, *args, **kwargs):
+        """
+        Recursively make requests to each endpoint in ``endpoints``, starting
+        with the one at ``index``.
+        """
+        endpoint = endpoints[index]
         d = super(MarathonClient, self).request(*args, url=endpoint, **kwargs)
 
+        # If this is the last endpoint, there's nothing to fall back to and
+        # any failure is returned as is
+        index += 1
+        if index == len(endpoints):
+            return d.addCallback(self._request_succeeded, endpoint)
+
         # If something goes wrong, call ourselves again with the remaining
         # endpoints
-        d.addErrback(self._request, endpoints, *args, **kwargs)
+        d.addCallbacks(
+            self._request_succeeded, self._request,
+            callbackArgs=(endpoint,), errbackArgs=(endpoints, index) + args,
+            errbackKeywords=kwargs)
         return d
 
+    def _request_succeeded(self, response, endpoint):
+        self._preferred_endpoint = endpoint
+        return response
+
     def _log_all_endpoints_failed(self, failure):
         # Just log an error so it is clear what has happened and return the
         # final failure. Individual failures should have been logged via
         # _log_request_error().
         self.log.error('Failed to make a request to all Marathon endpoints')
+        self._preferred_endpoint = None
         return failure
 
     def get_json_field(self, field, **kwargs):
@@ -109,13 +149,19 @@ class MarathonClient(HTTPClient):
         * There is an error response code
         * The field with the given name cannot be found
         """
-        d = self.request(
-            'GET', headers={'Accept': 'application/json'}, **kwargs)
-        d.addCallback(raise_for_status)
-        d.addCallback(raise_for_header, 'Content-Type', 'application/json')
-        d.addCallback(json_content)
-        d.addCallback(self._get_json_field, field)
-        return d
+        d = self.request('GET', headers=_JSON_HEADERS, **kwargs)
+        return d.addCallback(self._json_field_content, field)
+
+    def _json_field_content(self, response, field_name):
+        """
+        Check that the response was successful and contains JSON, and then
+        read the given field from the JSON content of the response.
+        """
+        raise_for_status(response)
+        raise_for_header(response, 'Content-Type', _APPLICATION_JSON)
+
+        return json_content(response).addCallback(
+            self._get_json_field, field_name)
 
     def _get_json_field(self, response_json, field_name):
         """
@@ -126,19 +172,51 @@ class MarathonClient(HTTPClient):
         :param: field_name:
             The name of the field in the JSON to get.
         """
-        if field_name not in response_json:
+        value = response_json.get(field_name, _MISSING)
+        if value is _MISSING:
+            # Only list the fields that are present, as the whole response
+            # could be very large
             raise KeyError('Unable to get value for "%s" from Marathon '
-                           'response: "%s"' % (
-                               field_name, json.dumps(response_json),))
+                           'response with fields: %s' % (
+                               field_name, ', '.join(sorted(response_json)),))
 
-        return response_json[field_name]
+        return value
 
     def get_apps(self):
         """
         Get the currently running Marathon apps, returning a list of app
         definitions.
         """
-        return self.get_json_field('apps', path='/v2/apps')
+        return self._coalesce(
+            'apps', self.get_json_field, 'apps', path='/v2/apps')
+
+    def _coalesce(self, key, func, *args, **kwargs):
+        """
+        Call ``func``, unless a call with the same key is still in progress.
+        Callers that arrive while a call is in progress may need a newer result
+        than that call will give them, so they all wait on a single follow-up
+        call that is made once the current call completes.
+        """
+        waiters = self._pending_calls.get(key)
+        if waiters is not None:
+            d = Deferred()
+            waiters.append(d)
+            return d
+
+        self._pending_calls[key] = []
+        d = maybeDeferred(func, *args, **kwargs)
+        return d.addBoth(self._coalesced_call_done, key, func, args, kwargs)
+
+    def _coalesced_call_done(self, result, key, func, args, kwargs):
+        waiters = self._pending_calls.pop(key)
+        if waiters:
+            def fan_out(follow_up_result):
+                for d in waiters:
+                    d.callback(follow_up_result)
+
+            self._coalesce(key, func, *args, **kwargs).addBoth(fan_out)
+
+        return result
 
     def get_events(self, callbacks):
         """
@@ -154,16 +232,17 @@ class MarathonClient(HTTPClient):
             # versions of Marathon it is ignored, and we ignore events we're
             # not interested in anyway.
             params={'event_type': sorted(callbacks.keys())},
-            headers={
-                'Accept': 'text/event-stream',
-                'Cache-Control': 'no-store'
-            })
+            headers=_EVENT_STREAM_HEADERS)
+
+        # This is called for every event, so look up the functions it uses
+        # just once
+        get_callback, loads = callbacks.get, json.loads
 
         def handler(event, data):
-            callback = callbacks.get(event)
+            callback = get_callback(event)
             # Deserialize JSON if a callback is present
             if callback is not None:
-                callback(json.loads(data))
+                callback(loads(data))
 
         return d.addCallback(
             sse_content, handler, reactor=self._reactor, **self._sse_kwargs)
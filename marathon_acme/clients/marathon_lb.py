@@ -1,4 +1,4 @@
-from twisted.internet.defer import DeferredList
+from twisted.internet.defer import DeferredList, DeferredSemaphore
 from twisted.logger import LogLevel
 
 from marathon_acme.clients._base import HTTPClient, raise_for_status
@@ -10,19 +10,29 @@ class MarathonLbClient(HTTPClient):
     marathon-lb.
     """
 
+    DEFAULT_MAX_CONCURRENCY = 8
+
     def __init__(self, endpoints, *args, **kwargs):
         """
         :param endpoints:
             The list of marathon-lb endpoints. All marathon-lb endpoints will
-            be called at once for any request.
+            be called for any request, with at most ``max_concurrency``
+            requests in flight at once.
+        :param max_concurrency:
+            The maximum number of requests to marathon-lb instances to have in
+            flight at once.
         """
+        max_concurrency = kwargs.pop(
+            'max_concurrency', self.DEFAULT_MAX_CONCURRENCY)
         super(MarathonLbClient, self).__init__(*args, **kwargs)
         self.endpoints = endpoints
+        self._semaphore = DeferredSemaphore(max_concurrency)
 
     def request(self, *args, **kwargs):
         return (
             DeferredList(
-                [self._request(e, *args, **kwargs) for e in self.endpoints],
+                [self._semaphore.run(self._request, e, *args, **kwargs)
+                 for e in self.endpoints],
                 consumeErrors=True)
             .addCallback(self._check_request_results))
 
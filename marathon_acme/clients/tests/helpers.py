@@ -48,6 +48,24 @@ class TestHTTPClientBase(TestCase):
         return d
 
 
+def _authority(uri):
+    """
+    Get the authority (e.g. b'example.com:80') out of a URI by scanning for
+    the characters around it, falling back to parsing the whole URI.
+    """
+    start = uri.find(b'//')
+    if start == -1:
+        return urisplit(uri).authority
+
+    start += 2
+    end = len(uri)
+    for delimiter in (b'/', b'?', b'#'):
+        index = uri.find(delimiter, start, end)
+        if index != -1:
+            end = index
+    return uri[start:end]
+
+
 class PerLocationAgent(object):
     """
     A twisted.web.iweb.IAgent that delegates to other agents for specific URI
@@ -66,7 +84,7 @@ class PerLocationAgent(object):
         self.agents[location] = agent
 
     def request(self, method, uri, headers=None, bodyProducer=None):
-        agent = self.agents[urisplit(uri).authority]
+        agent = self.agents[_authority(uri)]
         return agent.request(
             method, uri, headers=headers, bodyProducer=bodyProducer)
 
@@ -27,3 +27,21 @@ def HasRequestProperties(method, url, query=None):
         path=Equals(url.encode('ascii')),
         uri=After(lambda u: urisplit(u).getquerydict(), Equals(query))
     )
+
+
+def _request_url(request):
+    scheme = b'https' if request.isSecure() else b'http'
+    return b''.join((scheme, b'://', request.getHeader(b'host'), request.uri))
+
+
+def HasRequestUrl(url):
+    """
+    Check the full URL that a request received through treq's testing tools
+    was made to. The request line only has the path and query, so the scheme
+    and host (with any port) are added back from the request.
+
+    :param str url:
+        The HTTP URL, including any query parameters. Should already be
+        percent encoded.
+    """
+    return After(_request_url, Equals(url.encode('ascii')))
@@ -2,6 +2,8 @@ import os
 
 from OpenSSL.SSL import Error as SSLError
 
+from fixtures import TempDir
+
 from service_identity.exceptions import DNSMismatch, VerificationError
 
 from testtools import TestCase
@@ -15,6 +17,7 @@ from twisted.internet.defer import DeferredList
 from twisted.internet.endpoints import SSL4ServerEndpoint
 from twisted.internet.task import Clock
 from twisted.python.filepath import FilePath
+from twisted.test.proto_helpers import MemoryReactorClock
 from twisted.web._newclient import ResponseNeverReceived
 from twisted.web.client import Agent, HTTPConnectionPool
 from twisted.web.server import Site
@@ -47,9 +50,9 @@ class TestDefaultClientFunc(object):
         assert agent._reactor is reactor
         pool = agent._pool
 
-        # The agent has a connection pool that is not persistent
+        # The agent has a connection pool that is persistent
         assert isinstance(pool, HTTPConnectionPool)
-        assert not pool.persistent
+        assert pool.persistent
         # NOTE: Accessing Twisted HTTPConnectionPool internals :-(
         assert pool._reactor is reactor
 
@@ -101,7 +104,8 @@ class TestDefaultClientFunc(object):
         contextFactory = ClientPolicyForHTTPS()
 
         client, actual_reactor = default_client(
-            reactor, persistent=True, contextFactory=contextFactory)
+            reactor, persistent=False, maxPersistentPerHost=4,
+            contextFactory=contextFactory)
 
         # NOTE: Accessing treq HTTPClient internals :-(
         agent = client._agent
@@ -112,10 +116,37 @@ class TestDefaultClientFunc(object):
         pool = agent._pool
 
         assert isinstance(pool, HTTPConnectionPool)
-        assert pool.persistent
+        assert not pool.persistent
+        assert pool.maxPersistentPerHost == 4
         # NOTE: Accessing Twisted HTTPConnectionPool internals :-(
         assert pool._reactor is reactor
 
+    def test_no_shutdown_triggers(self):
+        """
+        When default_client creates connection pools, it shouldn't add any
+        triggers to the reactor that would keep the pools alive for the life
+        of the process. Closing a long-lived pool is left to its owner.
+        """
+        reactor = MemoryReactorClock()
+
+        default_client(reactor)
+        default_client(reactor)
+
+        assert reactor.triggers == {}
+
+    def test_pool_provided(self):
+        """
+        When default_client is passed a connection pool, it should create an
+        agent that uses that pool.
+        """
+        reactor = Clock()
+        pool = HTTPConnectionPool(reactor, persistent=True)
+
+        client, _ = default_client(reactor, pool=pool)
+
+        # NOTE: Accessing treq HTTPClient and Twisted _AgentBase internals :-(
+        assert client._agent._pool is pool
+
 
 FIXTURES = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'fixtures')
 CA_CERT = os.path.join(FIXTURES, 'ca.pem')
@@ -128,6 +159,52 @@ SERVER_CERT = os.path.join(FIXTURES, 'vault-server.pem')
 SERVER_KEY = os.path.join(FIXTURES, 'vault-server-key.pem')
 SERVER_COMMON_NAME = 'vault.example.org'
 
+# Parsed certificates for the server side of the TLS tests, keyed by the paths
+# they were loaded from, so that each fixture is only read and parsed once
+_certificates = {}
+# Server TLS options for each combination of fixtures, built once because
+# CertificateOptions does cipher selection and context setup on creation
+_server_options = {}
+
+
+def load_private_certificate(cert_path, key_path):
+    key = (cert_path, key_path)
+    if key not in _certificates:
+        certPEM = FilePath(cert_path).getContent()
+        keyPEM = FilePath(key_path).getContent()
+        _certificates[key] = (
+            ssl.PrivateCertificate.loadPEM(certPEM + b'\n' + keyPEM))
+    return _certificates[key]
+
+
+def load_certificate(cert_path):
+    if cert_path not in _certificates:
+        _certificates[cert_path] = (
+            ssl.Certificate.loadPEM(FilePath(cert_path).getContent()))
+    return _certificates[cert_path]
+
+
+def load_server_options(caKey, privateKey, certKey):
+    key = (caKey, privateKey, certKey)
+    if key not in _server_options:
+        # This is somewhat copied from the endpoint description parsing code:
+        # https://github.com/twisted/twisted/blob/twisted-18.7.0/src/twisted/internet/endpoints.py#L1325-L1408
+        # But we can't use endpoint descriptions because we want to verify
+        # the client certificate (add the trustRoot param to
+        # CertificateOptions).
+        privateCertificate = load_private_certificate(certKey, privateKey)
+
+        trustRoot = None
+        if caKey is not None:
+            trustRoot = load_certificate(caKey)
+
+        _server_options[key] = ssl.CertificateOptions(
+            privateKey=privateCertificate.privateKey.original,
+            certificate=privateCertificate.original,
+            trustRoot=trustRoot
+        )
+    return _server_options[key]
+
 
 class TestClientPolicyForHTTPS(TestCase):
     # FIXME: Twisted's (18.7.0) TLSMemoryBIOProtocol seems to hang around in
@@ -138,30 +215,19 @@ class TestClientPolicyForHTTPS(TestCase):
 
     def create_client(self, **policy_kwargs):
         policy = ClientPolicyForHTTPS.from_pem_files(**policy_kwargs)
-        client, _ = default_client(None, contextFactory=policy)
+
+        # Use our own persistent pool so that we can close its connections
+        # once the test is done and not leave them in the reactor
+        from twisted.internet import reactor
+        pool = HTTPConnectionPool(reactor, persistent=True)
+        self.addCleanup(pool.closeCachedConnections)
+
+        client, _ = default_client(reactor, contextFactory=policy, pool=pool)
         return client
 
     def create_ssl_server_endpoint(
             self, caKey=None, privateKey=SERVER_KEY, certKey=SERVER_CERT):
-        # This is somewhat copied from the endpoint description parsing code:
-        # https://github.com/twisted/twisted/blob/twisted-18.7.0/src/twisted/internet/endpoints.py#L1325-L1408
-        # But we can't use endpoint descriptions because we want to verify the
-        # client certificate (add the trustRoot param to CertificateOptions).
-        certPEM = FilePath(certKey).getContent()
-        keyPEM = FilePath(privateKey).getContent()
-        privateCertificate = (
-            ssl.PrivateCertificate.loadPEM(certPEM + b'\n' + keyPEM))
-
-        trustRoot = None
-        if caKey is not None:
-            caPEM = FilePath(caKey).getContent()
-            trustRoot = ssl.Certificate.loadPEM(caPEM)
-
-        cf = ssl.CertificateOptions(
-            privateKey=privateCertificate.privateKey.original,
-            certificate=privateCertificate.original,
-            trustRoot=trustRoot
-        )
+        cf = load_server_options(caKey, privateKey, certKey)
 
         from twisted.internet import reactor
         return SSL4ServerEndpoint(reactor, 0, cf, interface='127.0.0.1')
@@ -343,3 +409,35 @@ class TestClientPolicyForHTTPS(TestCase):
 
         return self._test_request(
             client, endpoint, assert_request, assert_response)
+
+    def test_ca_cert_bundle(self):
+        """
+        When the CA certificate file contains several certificates, all of
+        them should be trusted.
+        """
+        temp_dir = self.useFixture(TempDir())
+        bundle = temp_dir.join('bundle.pem')
+        with open(bundle, 'wb') as f:
+            for cert in [CA_CERT, CA2_CERT]:
+                f.write(FilePath(cert).getContent())
+
+        policy = ClientPolicyForHTTPS.from_pem_files(caKey=bundle)
+
+        # NOTE: Accessing ClientPolicyForHTTPS and Twisted
+        # OpenSSLCertificateAuthorities internals :-(
+        ca_certs = policy._trustRoot._caCerts
+        assert [c.get_subject() for c in ca_certs] == [
+            load_certificate(cert).original.get_subject()
+            for cert in [CA_CERT, CA2_CERT]]
+
+    def test_creator_cached(self):
+        """
+        When a connection creator is requested for the same hostname more than
+        once, the same creator should be returned each time.
+        """
+        policy = ClientPolicyForHTTPS()
+
+        creator = policy.creatorForNetloc(b'www.example.com', 443)
+
+        assert policy.creatorForNetloc(b'www.example.com', 443) is creator
+        assert policy.creatorForNetloc(b'www.example.org', 443) is not creator
@@ -1,6 +1,6 @@
 import json
 
-from testtools.matchers import Equals
+from testtools.matchers import Equals, HasLength
 from testtools.twistedsupport import failed, flush_logged_errors
 
 from treq.client import HTTPClient as treq_HTTPClient
@@ -28,9 +28,9 @@ def json_response(request, json_data, response_code=200):
 
 
 def write_json_event(request, event, json_data):
-    request.write('event: {}\n'.format(event).encode('utf-8'))
-    request.write('data: {}\n'.format(json.dumps(json_data)).encode('utf-8'))
-    request.write(b'\n')
+    data = json.dumps(json_data, separators=(',', ':'))
+    request.write(
+        'event: {}\ndata: {}\n\n'.format(event, data).encode('utf-8'))
 
 
 class TestMarathonClient(TestHTTPClientBase):
@@ -90,6 +90,35 @@ class TestMarathonClient(TestHTTPClientBase):
 
         flush_logged_errors(RuntimeError)
 
+    @inlineCallbacks
+    def test_request_fallback_preferred(self):
+        """
+        When we make a request and an endpoint fails but the next endpoint
+        succeeds, the endpoint that succeeded is tried first for the next
+        request.
+        """
+        agent = PerLocationAgent()
+        agent.add_agent(b'localhost:8080', FailingAgent())
+        agent.add_agent(b'localhost:9090', self.fake_server.get_agent())
+        client = MarathonClient(
+            ['http://localhost:8080', 'http://localhost:9090'],
+            client=treq_HTTPClient(agent))
+
+        for _ in range(2):
+            d = self.cleanup_d(client.request('GET', path='/my-path'))
+
+            request = yield self.requests.get()
+            self.assertThat(request, HasRequestProperties(
+                method='GET', url='http://localhost:9090/my-path'))
+
+            request.setResponseCode(200)
+            request.finish()
+
+            yield d
+
+        # Only the first request should have tried the failing endpoint
+        self.assertThat(flush_logged_errors(RuntimeError), HasLength(1))
+
     @inlineCallbacks
     def test_request_fallback_all_failed(self):
         """
@@ -221,13 +250,16 @@ class TestMarathonClient(TestHTTPClientBase):
         self.assertThat(request, HasRequestProperties(
             method='GET', url=self.uri('/my-path')))
 
-        json_response(request, {'other-field-key': 'do-not-care'})
+        json_response(request, {
+            'other-field-key': 'do-not-care',
+            'some-field-key': 'also-do-not-care',
+        })
 
         yield wait0()
         self.assertThat(d, failed(WithErrorTypeAndMessage(
             KeyError,
-            '\'Unable to get value for "field-key" from Marathon response: '
-            '"{"other-field-key": "do-not-care"}"\''
+            '\'Unable to get value for "field-key" from Marathon response '
+            'with fields: other-field-key, some-field-key\''
         )))
 
     @inlineCallbacks
@@ -281,6 +313,114 @@ class TestMarathonClient(TestHTTPClientBase):
         res = yield d
         self.assertThat(res, Equals(apps['apps']))
 
+    @inlineCallbacks
+    def test_get_apps_concurrent(self):
+        """
+        When we request the list of apps from Marathon while another request
+        for the list of apps is in progress, the result of the request in
+        progress could be out of date, so a new request should be made once
+        it completes. Callers that arrive while a request is in progress should
+        share that new request.
+        """
+        d1 = self.cleanup_d(self.client.get_apps())
+        d2 = self.cleanup_d(self.client.get_apps())
+        d3 = self.cleanup_d(self.client.get_apps())
+
+        request = yield self.requests.get()
+        self.assertThat(request, HasRequestProperties(
+            method='GET', url=self.uri('/v2/apps')))
+
+        yield wait0()
+        self.assertThat(self.requests.pending, HasLength(0))
+
+        json_response(request, {'apps': []})
+
+        apps1 = yield d1
+        self.assertThat(apps1, Equals([]))
+        self.assertThat(d2.called, Equals(False))
+        self.assertThat(d3.called, Equals(False))
+
+        # Once the first request has completed, a single new request is made
+        # for the other callers
+        request = yield self.requests.get()
+        self.assertThat(request, HasRequestProperties(
+            method='GET', url=self.uri('/v2/apps')))
+
+        yield wait0()
+        self.assertThat(self.requests.pending, HasLength(0))
+
+        json_response(request, {'apps': [{'id': '/my-app'}]})
+
+        apps2 = yield d2
+        apps3 = yield d3
+        self.assertThat(apps2, Equals([{'id': '/my-app'}]))
+        self.assertThat(apps3, Equals([{'id': '/my-app'}]))
+
+        # Once all the requests have completed, the next call makes a new
+        # request straight away
+        self.cleanup_d(self.client.get_apps())
+        request = yield self.requests.get()
+        json_response(request, {'apps': []})
+
+    @inlineCallbacks
+    def test_get_apps_concurrent_failure(self):
+        """
+        When we request the list of apps from Marathon while another request
+        for the list of apps is in progress, and the new request made after
+        it fails, all the callers waiting on the new request should receive
+        the failure.
+        """
+        d1 = self.cleanup_d(self.client.get_apps())
+        d2 = self.cleanup_d(self.client.get_apps())
+        d3 = self.cleanup_d(self.client.get_apps())
+
+        request = yield self.requests.get()
+        json_response(request, {'apps': []})
+
+        apps1 = yield d1
+        self.assertThat(apps1, Equals([]))
+
+        request = yield self.requests.get()
+        request.setResponseCode(500)
+        request.finish()
+
+        yield wait0()
+        for d in [d2, d3]:
+            self.assertThat(d, failed(WithErrorTypeAndMessage(
+                HTTPError, '500 Server Error for url: %s' % (
+                    self.uri('/v2/apps'),))))
+
+    @inlineCallbacks
+    def test_get_apps_synchronous_failure(self):
+        """
+        When requesting the list of apps from Marathon fails before a request
+        is made, the failure should be returned and later calls should still
+        make requests.
+        """
+        get_json_field = self.client.get_json_field
+        errors = [RuntimeError('Something went wrong')]
+
+        def failing_get_json_field(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return get_json_field(*args, **kwargs)
+
+        self.client.get_json_field = failing_get_json_field
+
+        d1 = self.client.get_apps()
+        self.assertThat(d1, failed(WithErrorTypeAndMessage(
+            RuntimeError, 'Something went wrong')))
+
+        d2 = self.cleanup_d(self.client.get_apps())
+
+        request = yield self.requests.get()
+        self.assertThat(request, HasRequestProperties(
+            method='GET', url=self.uri('/v2/apps')))
+        json_response(request, {'apps': [{'id': '/my-app'}]})
+
+        apps = yield d2
+        self.assertThat(apps, Equals([{'id': '/my-app'}]))
+
     @inlineCallbacks
     def test_get_events(self):
         """
@@ -301,10 +441,7 @@ class TestMarathonClient(TestHTTPClientBase):
         request.setHeader('Content-Type', 'text/event-stream')
 
         json_data = {'hello': 'world'}
-        request.write(b'event: test\n')
-        request.write(
-            'data: {}\n'.format(json.dumps(json_data)).encode('utf-8'))
-        request.write(b'\n')
+        write_json_event(request, 'test', json_data)
 
         yield wait0()
         self.assertThat(data, Equals([json_data]))
@@ -335,10 +472,7 @@ class TestMarathonClient(TestHTTPClientBase):
         request.setHeader('Content-Type', 'text/event-stream')
 
         json_data = {'hello': 'world'}
-        request.write(b'event: not_test\n')
-        request.write(
-            'data: {}\n'.format(json.dumps(json_data)).encode('utf-8'))
-        request.write(b'\n')
+        write_json_event(request, 'not_test', json_data)
 
         yield wait0()
         self.assertThat(data, Equals([]))
@@ -370,10 +504,7 @@ class TestMarathonClient(TestHTTPClientBase):
         request.setHeader('Content-Type', 'text/event-stream')
 
         json_data1 = {'hello': 'world'}
-        request.write(b'event: test\n')
-        request.write(
-            'data: {}\n'.format(json.dumps(json_data1)).encode('utf-8'))
-        request.write(b'\n')
+        write_json_event(request, 'test', json_data1)
 
         json_data2 = {'hi': 'planet'}
         request.write(
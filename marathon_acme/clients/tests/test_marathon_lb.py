@@ -1,167 +1,213 @@
-from testtools.matchers import Equals, HasLength, Is, MatchesStructure
-from testtools.twistedsupport import failed, flush_logged_errors
+from testtools.assertions import assert_that
+from testtools.matchers import (
+    Equals, HasLength, Is, MatchesAll, MatchesListwise, MatchesStructure)
+from testtools.twistedsupport import failed, succeeded
 
-from twisted.internet.defer import inlineCallbacks
+from treq.testing import StubTreq
 
-from txfake.fake_connection import wait0
+from twisted.logger import globalLogPublisher
 
 from marathon_acme.clients._base import HTTPError
 from marathon_acme.clients.marathon_lb import MarathonLbClient
-from marathon_acme.clients.tests.helpers import TestHTTPClientBase
-from marathon_acme.clients.tests.matchers import HasRequestProperties
+from marathon_acme.clients.tests.helpers import QueueResource
+from marathon_acme.clients.tests.matchers import HasRequestUrl
 from marathon_acme.tests.matchers import HasHeader, WithErrorTypeAndMessage
 
 
-class TestMarathonLbClient(TestHTTPClientBase):
-    def get_client(self, client):
-        return MarathonLbClient(['http://lb1:9090', 'http://lb2:9090'],
-                                client=client)
+def IsLbRequest(method, url):
+    """
+    Check that a request was made with the given method to the full URL
+    given, including the marathon-lb instance and any query.
+    """
+    return MatchesAll(
+        MatchesStructure(method=Equals(method.encode('ascii'))),
+        HasRequestUrl(url)
+    )
+
+
+class TestMarathonLbClient(object):
+    # NOTE: Like the Vault client tests, these tests use treq's testing
+    # machinery and are synchronous.
+
+    def setup_method(self):
+        self.requests = QueueResource()
+        self.stub_client = StubTreq(self.requests)
+
+        self.client = MarathonLbClient(
+            ['http://lb1:9090', 'http://lb2:9090'], client=self.stub_client)
+
+        # Keep track of the failures that are logged
+        self.logged_failures = []
+        globalLogPublisher.addObserver(self.observe_log_failures)
+
+    def teardown_method(self):
+        globalLogPublisher.removeObserver(self.observe_log_failures)
+
+    def observe_log_failures(self, event):
+        if 'log_failure' in event:
+            self.logged_failures.append(event['log_failure'])
+
+    def text_response(self, request, text, code=200):
+        request.setResponseCode(code)
+        request.setHeader('content-type', 'text/plain')
+        request.write(text)
+        request.finish()
+        self.stub_client.flush()
 
-    @inlineCallbacks
     def test_request_success(self):
         """
         When a request is made, it is made to all marathon-lb instances and
         the responses are returned.
         """
-        d = self.cleanup_d(self.client.request('GET', path='/my-path'))
+        d = self.client.request('GET', path='/my-path')
+
+        for lb in ['lb1', 'lb2']:
+            request_d = self.requests.get()
+            assert_that(request_d, succeeded(
+                IsLbRequest('GET', 'http://%s:9090/my-path' % (lb,))))
+
+            self.text_response(request_d.result, b'')
+
+        assert_that(d, succeeded(MatchesListwise([
+            MatchesStructure(code=Equals(200)),
+            MatchesStructure(code=Equals(200)),
+        ])))
+
+    def test_request_max_concurrency(self):
+        """
+        When a request is made, no more than the maximum number of requests to
+        marathon-lb instances should be in flight at once.
+        """
+        client = MarathonLbClient(
+            ['http://lb1:9090', 'http://lb2:9090'], max_concurrency=1,
+            client=self.stub_client)
+        d = client.request('GET', path='/my-path')
 
         for lb in ['lb1', 'lb2']:
-            request = yield self.requests.get()
-            self.assertThat(request, HasRequestProperties(
-                method='GET', url='http://%s:9090/my-path' % (lb,)))
+            request_d = self.requests.get()
+            assert_that(request_d, succeeded(
+                IsLbRequest('GET', 'http://%s:9090/my-path' % (lb,))))
 
-            request.setResponseCode(200)
-            request.finish()
+            # No other request is made until this one completes
+            self.requests.assert_empty()
 
-        responses = yield d
-        self.assertThat(responses, HasLength(2))
-        for response in responses:
-            self.assertThat(response.code, Equals(200))
+            self.text_response(request_d.result, b'')
+
+        assert_that(d, succeeded(HasLength(2)))
 
-    @inlineCallbacks
     def test_request_partial_failure(self):
         """
         When a request is made and an error status code is returned from some
         (but not all) of the matathon-lb instances, then the request returns
         the list of responses with a None value for the unhappy request.
         """
-        d = self.cleanup_d(self.client.request('GET', path='/my-path'))
+        d = self.client.request('GET', path='/my-path')
 
-        lb1_request = yield self.requests.get()
-        self.assertThat(lb1_request, HasRequestProperties(
-            method='GET', url='http://lb1:9090/my-path'))
+        lb1_request_d = self.requests.get()
+        assert_that(lb1_request_d, succeeded(
+            IsLbRequest('GET', 'http://lb1:9090/my-path')))
 
-        lb2_request = yield self.requests.get()
-        self.assertThat(lb2_request, HasRequestProperties(
-            method='GET', url='http://lb2:9090/my-path'))
+        lb2_request_d = self.requests.get()
+        assert_that(lb2_request_d, succeeded(
+            IsLbRequest('GET', 'http://lb2:9090/my-path')))
 
         # Fail the first one
-        lb1_request.setResponseCode(500)
-        lb1_request.setHeader('content-type', 'text/plain')
-        lb1_request.write(b'Internal Server Error')
-        lb1_request.finish()
+        self.text_response(
+            lb1_request_d.result, b'Internal Server Error', code=500)
 
         # ...but succeed the second
-        lb2_request.setResponseCode(200)
-        lb2_request.setHeader('content-type', 'text/plain')
-        lb2_request.write(b'Yes, I work')
-        lb2_request.finish()
+        self.text_response(lb2_request_d.result, b'Yes, I work')
 
-        responses = yield d
-        self.assertThat(responses, HasLength(2))
-        lb1_response, lb2_response = responses
+        assert_that(d, succeeded(HasLength(2)))
+        lb1_response, lb2_response = d.result
 
-        self.assertThat(lb1_response, Is(None))
-        self.assertThat(lb2_response, MatchesStructure(
+        assert_that(lb1_response, Is(None))
+        assert_that(lb2_response, MatchesStructure(
             code=Equals(200),
             headers=HasHeader('content-type', ['text/plain'])
         ))
 
-        lb2_response_content = yield lb2_response.content()
-        self.assertThat(lb2_response_content, Equals(b'Yes, I work'))
+        assert_that(lb2_response.content(), succeeded(Equals(b'Yes, I work')))
 
-        flush_logged_errors(HTTPError)
+        # The failed request is logged
+        assert_that(self.logged_failures, MatchesListwise([
+            WithErrorTypeAndMessage(
+                HTTPError,
+                '500 Server Error for url: http://lb1:9090/my-path'),
+        ]))
 
-    @inlineCallbacks
     def test_request_failure(self):
         """
         When the requests to all the marathon-lb instances have a bad status
         code then an error should be raised.
         """
-        d = self.cleanup_d(self.client.request('GET', path='/my-path'))
+        d = self.client.request('GET', path='/my-path')
 
         for lb in ['lb1', 'lb2']:
-            request = yield self.requests.get()
-            self.assertThat(request, HasRequestProperties(
-                method='GET', url='http://%s:9090/my-path' % (lb,)))
+            request_d = self.requests.get()
+            assert_that(request_d, succeeded(
+                IsLbRequest('GET', 'http://%s:9090/my-path' % (lb,))))
 
-            request.setResponseCode(500)
-            request.setHeader('content-type', 'text/plain')
-            request.write(b'Internal Server Error')
-            request.finish()
+            self.text_response(
+                request_d.result, b'Internal Server Error', code=500)
 
-        yield wait0()
-        self.assertThat(d, failed(WithErrorTypeAndMessage(
+        assert_that(d, failed(WithErrorTypeAndMessage(
             RuntimeError,
             'Failed to make a request to all marathon-lb instances'
         )))
 
-        flush_logged_errors(HTTPError)
+        # Each failed request is logged
+        assert_that(self.logged_failures, MatchesListwise([
+            WithErrorTypeAndMessage(
+                HTTPError, '500 Server Error for url: http://%s:9090/my-path'
+                % (lb,))
+            for lb in ['lb1', 'lb2']
+        ]))
 
-    @inlineCallbacks
     def test_mlb_signal_hup(self):
         """
         When the marathon-lb client is used to send a SIGHUP signal to
         marathon-lb, all the correct API endpoints are called.
         """
-        d = self.cleanup_d(self.client.mlb_signal_hup())
+        d = self.client.mlb_signal_hup()
 
         for lb in ['lb1', 'lb2']:
-            request = yield self.requests.get()
-            self.assertThat(request, HasRequestProperties(
-                method='POST', url='http://%s:9090/_mlb_signal/hup' % (lb,)))
-
-            request.setResponseCode(200)
-            request.setHeader('content-type', 'text/plain')
-            request.write(b'Sent SIGHUP signal to marathon-lb')
-            request.finish()
-
-        responses = yield d
-        self.assertThat(len(responses), Equals(2))
-        for response in responses:
-            self.assertThat(response.code, Equals(200))
-            self.assertThat(response.headers, HasHeader(
+            request_d = self.requests.get()
+            assert_that(request_d, succeeded(IsLbRequest(
+                'POST', 'http://%s:9090/_mlb_signal/hup' % (lb,))))
+
+            self.text_response(
+                request_d.result, b'Sent SIGHUP signal to marathon-lb')
+
+        assert_that(d, succeeded(HasLength(2)))
+        for response in d.result:
+            assert_that(response.code, Equals(200))
+            assert_that(response.headers, HasHeader(
                 'content-type', ['text/plain']))
 
-            response_text = yield response.text()
-            self.assertThat(response_text,
-                            Equals('Sent SIGHUP signal to marathon-lb'))
+            assert_that(response.text(), succeeded(
+                Equals('Sent SIGHUP signal to marathon-lb')))
 
-    @inlineCallbacks
     def test_mlb_signal_usr1(self):
         """
         When the marathon-lb client is used to send a SIGUSR1 signal to
         marathon-lb, all the correct API endpoint is called.
         """
-        d = self.cleanup_d(self.client.mlb_signal_usr1())
+        d = self.client.mlb_signal_usr1()
 
         for lb in ['lb1', 'lb2']:
-            request = yield self.requests.get()
-            self.assertThat(request, HasRequestProperties(
-                method='POST', url='http://%s:9090/_mlb_signal/usr1' % (lb,)))
-
-            request.setResponseCode(200)
-            request.setHeader('content-type', 'text/plain')
-            request.write(b'Sent SIGUSR1 signal to marathon-lb')
-            request.finish()
-
-        responses = yield d
-        self.assertThat(len(responses), Equals(2))
-        for response in responses:
-            self.assertThat(response.code, Equals(200))
-            self.assertThat(response.headers, HasHeader(
+            request_d = self.requests.get()
+            assert_that(request_d, succeeded(IsLbRequest(
+                'POST', 'http://%s:9090/_mlb_signal/usr1' % (lb,))))
+
+            self.text_response(
+                request_d.result, b'Sent SIGUSR1 signal to marathon-lb')
+
+        assert_that(d, succeeded(HasLength(2)))
+        for response in d.result:
+            assert_that(response.code, Equals(200))
+            assert_that(response.headers, HasHeader(
                 'content-type', ['text/plain']))
 
-            response_text = yield response.text()
-            self.assertThat(response_text,
-                            Equals('Sent SIGUSR1 signal to marathon-lb'))
+            assert_that(response.text(), succeeded(
+                Equals('Sent SIGUSR1 signal to marathon-lb')))
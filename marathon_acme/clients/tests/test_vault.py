@@ -16,6 +16,43 @@ from marathon_acme.tests.helpers import read_request_json
 from marathon_acme.tests.matchers import HasHeader, WithErrorTypeAndMessage
 
 
+# Example responses from the Vault key/value API
+READ_RESPONSE = {
+    "request_id": "08b0ba90-b6e4-afab-de6a-d2fbf8f480b3",
+    "lease_id": "",
+    "renewable": False,
+    "lease_duration": 0,
+    "data": {
+        "data": {"foo": "world"},
+        "metadata": {
+            "created_time": "2018-09-05T12:49:52.722404Z",
+            "deletion_time": "",
+            "destroyed": False,
+            "version": 1
+        }
+    },
+    "wrap_info": None,
+    "warnings": None,
+    "auth": None
+}
+
+WRITE_RESPONSE = {
+    "request_id": "c5512c45-cace-ed90-1630-bbf2608aefea",
+    "lease_id": "",
+    "renewable": False,
+    "lease_duration": 0,
+    "data": {
+        "created_time": "2018-09-05T12:53:41.405819Z",
+        "deletion_time": "",
+        "destroyed": False,
+        "version": 2
+    },
+    "wrap_info": None,
+    "warnings": None,
+    "auth": None
+}
+
+
 class TestVaultClient(object):
     # NOTE: Unlike the other client tests, these tests use treq's testing
     # machinery, which we didn't know about before. This means we don't have to
@@ -51,30 +88,11 @@ class TestVaultClient(object):
         )))
 
         # Write the response
-        dummy_response = {
-            "request_id": "08b0ba90-b6e4-afab-de6a-d2fbf8f480b3",
-            "lease_id": "",
-            "renewable": False,
-            "lease_duration": 0,
-            "data": {
-                "data": {"foo": "world"},
-                "metadata": {
-                    "created_time": "2018-09-05T12:49:52.722404Z",
-                    "deletion_time": "",
-                    "destroyed": False,
-                    "version": 1
-                }
-            },
-            "wrap_info": None,
-            "warnings": None,
-            "auth": None
-        }
-
         request = request_d.result
-        self.json_response(request, dummy_response)
+        self.json_response(request, READ_RESPONSE)
 
         # Response should be returned
-        assert_that(d, succeeded(Equals(dummy_response)))
+        assert_that(d, succeeded(Equals(READ_RESPONSE)))
 
     def test_write(self):
         """
@@ -93,27 +111,29 @@ class TestVaultClient(object):
         )))
 
         # Write the response
-        dummy_response = {
-            "request_id": "c5512c45-cace-ed90-1630-bbf2608aefea",
-            "lease_id": "",
-            "renewable": False,
-            "lease_duration": 0,
-            "data": {
-                "created_time": "2018-09-05T12:53:41.405819Z",
-                "deletion_time": "",
-                "destroyed": False,
-                "version": 2
-            },
-            "wrap_info": None,
-            "warnings": None,
-            "auth": None
-        }
-
         request = request_d.result
-        self.json_response(request, dummy_response)
+        self.json_response(request, WRITE_RESPONSE)
 
         # Response should be returned
-        assert_that(d, succeeded(Equals(dummy_response)))
+        assert_that(d, succeeded(Equals(WRITE_RESPONSE)))
+
+    def test_request_headers(self):
+        """
+        When a request is made with headers, the request has those headers as
+        well as the token header, and the headers passed are not changed.
+        """
+        headers = {'Accept': 'application/json'}
+        self.client.request('GET', '/v1/secret/data/hello', headers=headers)
+
+        request_d = self.requests.get()
+        assert_that(request_d, succeeded(MatchesAll(
+            HasRequestProperties(method='GET', url='/v1/secret/data/hello'),
+            MatchesStructure(requestHeaders=MatchesAll(
+                HasHeader('Accept', ['application/json']),
+                HasHeader('X-Vault-Token', [self.token])))
+        )))
+
+        assert_that(headers, Equals({'Accept': 'application/json'}))
 
     def test_client_error(self):
         """
@@ -191,30 +211,11 @@ class TestVaultClient(object):
         )))
 
         # Write the response
-        dummy_response = {
-            "request_id": "08b0ba90-b6e4-afab-de6a-d2fbf8f480b3",
-            "lease_id": "",
-            "renewable": False,
-            "lease_duration": 0,
-            "data": {
-                "data": {"foo": "world"},
-                "metadata": {
-                    "created_time": "2018-09-05T12:49:52.722404Z",
-                    "deletion_time": "",
-                    "destroyed": False,
-                    "version": 1
-                }
-            },
-            "wrap_info": None,
-            "warnings": None,
-            "auth": None
-        }
-
         request = request_d.result
-        self.json_response(request, dummy_response)
+        self.json_response(request, READ_RESPONSE)
 
         # Response should be returned
-        assert_that(d, succeeded(Equals(dummy_response)))
+        assert_that(d, succeeded(Equals(READ_RESPONSE)))
 
     def test_read_kv2_with_version(self):
         """
@@ -259,27 +260,11 @@ class TestVaultClient(object):
         )))
 
         # Write the response
-        dummy_response = {
-            "request_id": "c5512c45-cace-ed90-1630-bbf2608aefea",
-            "lease_id": "",
-            "renewable": False,
-            "lease_duration": 0,
-            "data": {
-                "created_time": "2018-09-05T12:53:41.405819Z",
-                "deletion_time": "",
-                "destroyed": False,
-                "version": 2
-            },
-            "wrap_info": None,
-            "warnings": None,
-            "auth": None
-        }
-
         request = request_d.result
-        self.json_response(request, dummy_response)
+        self.json_response(request, WRITE_RESPONSE)
 
         # Response should be returned
-        assert_that(d, succeeded(Equals(dummy_response)))
+        assert_that(d, succeeded(Equals(WRITE_RESPONSE)))
 
     def test_create_or_update_kv2_with_cas(self):
         """
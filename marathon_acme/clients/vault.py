@@ -1,11 +1,10 @@
 import json
 import os
 
-from requests.exceptions import RequestException
-
 from twisted.web.http import BAD_REQUEST, NOT_FOUND
 
-from marathon_acme.clients._base import HTTPClient, get_single_header
+from marathon_acme.clients._base import (
+    HTTPClient, RequestException, get_single_header, json_content)
 from marathon_acme.clients._tx_util import ClientPolicyForHTTPS, default_client
 
 
@@ -40,6 +39,7 @@ class VaultClient(HTTPClient):
         """
         super(VaultClient, self).__init__(*args, url=url, **kwargs)
         self._token = token
+        self._token_headers = {'X-Vault-Token': token}
 
     @classmethod
     def from_env(cls, reactor=None, env=os.environ):
@@ -83,8 +83,12 @@ class VaultClient(HTTPClient):
         return cls(address, token, client=client, reactor=reactor)
 
     def request(self, method, path, *args, **kwargs):
-        headers = kwargs.pop('headers', {})
-        headers['X-Vault-Token'] = self._token
+        headers = kwargs.pop('headers', None)
+        if headers is None:
+            headers = self._token_headers
+        else:
+            headers = dict(headers)
+            headers.update(self._token_headers)
         return super(VaultClient, self).request(
             method, *args, path=path, headers=headers, **kwargs)
 
@@ -92,7 +96,7 @@ class VaultClient(HTTPClient):
         if 400 <= response.code < 600:
             return self._handle_error(response, check_cas)
 
-        return response.json()
+        return json_content(response)
 
     def _handle_error(self, response, check_cas):
         # Decode as utf-8. treq's text() method uses ISO-8859-1 which is
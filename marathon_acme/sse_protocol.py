@@ -82,7 +82,8 @@ class SseProtocol(Protocol, TimeoutMixin):
             transport.abortConnection()
         else:
             self.log.error(
-                'Transport {} has no abortConnection method'.format(transport))
+                'Transport {transport} has no abortConnection method',
+                transport=transport)
 
     def _reset_event_data(self):
         self._event = 'message'
@@ -195,18 +196,19 @@ class SseProtocol(Protocol, TimeoutMixin):
 
 def _parse_field_value(line):
     """ Parse the field and value from a line. """
-    if line.startswith(':'):
-        # Ignore the line
-        return None, None
+    # Split the line on the first ':' in a single pass
+    field, colon, value = line.partition(':')
 
-    if ':' not in line:
+    if not colon:
         # Treat the entire line as the field, use empty string as value
         return line, ''
 
-    # Else field is before the ':' and value is after
-    field, value = line.split(':', 1)
+    if not field:
+        # The line starts with ':', ignore the line
+        return None, None
 
     # If value starts with a space, remove it.
-    value = value[1:] if value.startswith(' ') else value
+    if value.startswith(' '):
+        value = value[1:]
 
     return field, value
@@ -1,4 +1,5 @@
 import os
+import sys
 
 from fixtures import TempDir
 
@@ -12,10 +13,15 @@ from testtools.twistedsupport import (
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
 from twisted.internet.error import CannotListenError, ConnectionRefusedError
+from twisted.logger import LogBeginner, LogPublisher
+from twisted.test.proto_helpers import MemoryReactorClock
 
 from txacme.urls import LETSENCRYPT_STAGING_DIRECTORY
 
-from marathon_acme.cli import init_storage_dir, main, parse_listen_addr
+from marathon_acme import cli
+from marathon_acme.cli import (
+    create_marathon_acme, init_logging, init_storage_dir, main,
+    parse_listen_addr)
 
 
 # Make sure we always use the Let's Encrypt Staging endpoint for these tests
@@ -231,3 +237,104 @@ class TestInitStorageDir(object):
         assert_that(str(tmpdir.join('default.pem')), FileContains('blah'))
 
         assert_that(str(tmpdir.join('certs')), DirExists())
+
+
+class TestCreateMarathonAcme(object):
+    def test_pool_closed_on_shutdown(self):
+        """
+        When marathon-acme is created, the connection pool shared by the
+        Marathon and marathon-lb clients should have its cached connections
+        closed before the reactor shuts down, with only one trigger added.
+        """
+        reactor = MemoryReactorClock()
+
+        marathon_acme = create_marathon_acme(
+            None, None, None, False, ['http://localhost:8080'], 10, 30,
+            ['http://localhost:9090'], 'external', reactor)
+
+        # NOTE: Accessing treq HTTPClient and Twisted _AgentBase internals :-(
+        pool = marathon_acme.marathon_client._client._agent._pool
+        assert pool.maxPersistentPerHost == 4
+        assert reactor.triggers['before']['shutdown'] == [
+            (pool.closeCachedConnections, (), {})]
+
+
+class RecordingLogBeginner(LogBeginner):
+    """
+    A log beginner for a private log publisher that records how it was told
+    to begin logging and never touches the global standard IO or warnings.
+    """
+    def __init__(self, publisher):
+        super(RecordingLogBeginner, self).__init__(
+            publisher, sys.stderr, sys, FakeWarningsModule())
+        self.begin_calls = []
+
+    def beginLoggingTo(self, observers, discardBuffer=False,
+                       redirectStandardIO=True):
+        self.begin_calls.append({
+            'observers': list(observers),
+            'discardBuffer': discardBuffer,
+            'redirectStandardIO': redirectStandardIO,
+        })
+        super(RecordingLogBeginner, self).beginLoggingTo(
+            observers, discardBuffer=discardBuffer,
+            redirectStandardIO=redirectStandardIO)
+
+
+class FakeWarningsModule(object):
+    def showwarning(self, *args, **kwargs):
+        pass
+
+
+class TestInitLogging(object):
+    def setup_method(self):
+        self.publisher = LogPublisher()
+        self.beginner = RecordingLogBeginner(self.publisher)
+
+        self._orig = (
+            cli.globalLogBeginner, cli.globalLogPublisher, cli._log_observer)
+        cli.globalLogBeginner = self.beginner
+        cli.globalLogPublisher = self.publisher
+        # Other tests may have already initialised logging via main()
+        cli._log_observer = None
+
+    def teardown_method(self):
+        if cli._log_observer is not None:
+            self.publisher.removeObserver(cli._log_observer)
+        (cli.globalLogBeginner, cli.globalLogPublisher,
+         cli._log_observer) = self._orig
+
+    def test_begin_logging(self):
+        """
+        When logging is initialised for the first time, the log beginner is
+        told to begin logging to the observer and discard its buffer.
+        """
+        init_logging('info')
+
+        assert self.beginner.begin_calls == [{
+            'observers': [cli._log_observer],
+            'discardBuffer': True,
+            'redirectStandardIO': False,
+        }]
+        # NOTE: Accessing Twisted LogPublisher internals :-(
+        assert cli._log_observer in self.publisher._observers
+
+    def test_observer_replaced(self):
+        """
+        When logging is initialised more than once, the observer from the
+        previous call is replaced rather than a second observer being added,
+        and the log beginner isn't told to begin logging again.
+        """
+        # NOTE: Accessing Twisted LogPublisher internals :-(
+        observers = self.publisher._observers
+
+        init_logging('info')
+        first_observer = cli._log_observer
+        assert first_observer in observers
+        num_observers = len(observers)
+
+        init_logging('debug')
+        assert first_observer not in observers
+        assert cli._log_observer in observers
+        assert len(observers) == num_observers
+        assert len(self.beginner.begin_calls) == 1
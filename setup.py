@@ -28,7 +28,6 @@ install_requires = [
     'josepy',
     'klein',
     'pem >= 16.1.0',
-    'requests',
     # treq.testing broken on older versions of treq with Twisted 17.1.0
     'treq >= 17.3.1',
     # Despite treq & txacme depending on Twisted[tls], we don't get all the tls